@@ -7,11 +7,13 @@ Automatically handles dependencies and runs the Flask application
 import os
 import sys
 import logging
+import re
 import json
-import yaml  # type: ignore[import]
-import requests  # type: ignore[import]
+import time
+import hashlib
+import functools
+import threading
 import traceback
-from flask import Flask, render_template, request, jsonify  # type: ignore[import]
 
 # Configure logging early with timestamp
 logging.basicConfig(
@@ -25,17 +27,106 @@ print("=====================================")
 print("AI Automation Builder Startup")
 print(f"Python version: {sys.version}")
 print(f"Current directory: {os.getcwd()}")
-print(f"Directory contents: {os.listdir('.')}")
 print("=====================================")
 
 # Global flag to track LLM status
 llm_initialized = False
 
+# Short-lived cache of the /api/entities response so rapid polls share one HA call
+ENTITIES_CACHE_TTL = 2.0
+_entities_cache = {'at': 0.0, 'payload': None, 'etag': None}
+_entities_cache_lock = threading.Lock()
+
+# Keyword matcher for template-based generation, compiled on first use
+_KW_RE = None
+
+def _get_keyword_re():
+    """Return the compiled keyword regex, compiling it on first call"""
+    global _KW_RE
+    if _KW_RE is None:
+        _KW_RE = re.compile(r'\b(sunset|dusk|sunrise|dawn|motion|detected|light|on|off)(?:s|ing)?\b', re.I)
+    return _KW_RE
+
+@functools.lru_cache(maxsize=1)
+def _yaml_dumper():
+    """Return the fastest available safe YAML dumper, preferring the libyaml C emitter"""
+    import yaml  # type: ignore[import]
+    if not getattr(yaml, '__with_libyaml__', False):
+        logger.warning("PyYAML was built without libyaml. YAML output will use the slower pure-Python emitter.")
+    return getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+# Prebuilt triggers/actions, assigned by reference by the template automation
+_TRIG_SUNSET = {"platform": "sun", "event": "sunset", "offset": "0:00:00"}
+_TRIG_SUNRISE = {"platform": "sun", "event": "sunrise", "offset": "0:00:00"}
+_TRIG_MOTION = {"platform": "state", "entity_id": "binary_sensor.motion_sensor", "to": "on"}
+_ACTION_LIGHT_ON = {"service": "light.turn_on", "target": {"entity_id": "light.living_room"}}
+_ACTION_LIGHT_OFF = {"service": "light.turn_off", "target": {"entity_id": "light.living_room"}}
+
+# Cached per description - callers share the result, so they get it through _copy_automation
+@functools.lru_cache(maxsize=256)
+def _template_automation(description):
+    """Build a template-based automation from keywords in the description"""
+    automation = {
+        'alias': f'AI Generated: {description[:50]}...' if len(description) > 50 else f'AI Generated: {description}',
+        'description': f'Generated from: {description}',
+        'trigger': [
+            {
+                'platform': 'time',
+                'at': '12:00:00'
+            }
+        ],
+        'condition': [],
+        'action': [
+            {
+                'service': 'notify.notify',
+                'data': {
+                    'message': f'Automation triggered: {description}'
+                }
+            }
+        ],
+        'mode': 'single'
+    }
+    
+    # Simple rule-based enhancements - scan the description once for all keywords
+    hits = {m.group(1).lower() for m in _get_keyword_re().finditer(description)}
+    
+    if "sunset" in hits or "dusk" in hits:
+        automation["trigger"] = [_TRIG_SUNSET]
+        
+    if "sunrise" in hits or "dawn" in hits:
+        automation["trigger"] = [_TRIG_SUNRISE]
+        
+    if "motion" in hits and "detected" in hits:
+        automation["trigger"] = [_TRIG_MOTION]
+        
+    if "light" in hits and "on" in hits:
+        automation["action"] = [_ACTION_LIGHT_ON]
+        
+    if "light" in hits and "off" in hits:
+        automation["action"] = [_ACTION_LIGHT_OFF]
+
+    return automation
+
+def _copy_automation(automation):
+    """Copy a cached template automation, including the prebuilt trigger/action dicts it shares"""
+    copied = dict(automation)
+    copied['trigger'] = [dict(trigger) for trigger in automation['trigger']]
+    copied['condition'] = list(automation['condition'])
+    copied['action'] = [{key: dict(value) if isinstance(value, dict) else value
+                         for key, value in action.items()}
+                        for action in automation['action']]
+    return copied
+
+@functools.lru_cache(maxsize=1)
+def _llm_manager():
+    """Import llm_integration once and return its shared LLM manager"""
+    from llm_integration import get_llm_manager  # type: ignore[import]
+    return get_llm_manager()
+
 def check_and_install_dependencies():
     """Check and install dependencies before running the app"""
     try:
         # Try to import dependency manager
-        print("Checking for dependency_manager.py...")
         if not os.path.exists('dependency_manager.py'):
             logger.error("dependency_manager.py not found in current directory!")
             print(f"Files in current directory: {os.listdir('.')}")
@@ -46,7 +137,7 @@ def check_and_install_dependencies():
         logger.info("Running dependency check...")
         manager = DependencyManager()
         
-        if not manager.run_dependency_check():
+        if not manager.run_dependency_check(force="--force-check" in sys.argv):
             logger.error("Dependency check failed. Cannot start application.")
             return False
             
@@ -68,19 +159,16 @@ def initialize_llm():
     global llm_initialized
     
     try:
-        print("Checking for llm_integration.py...")
         if not os.path.exists('llm_integration.py'):
             logger.error("llm_integration.py not found in current directory!")
             print(f"Files in current directory: {os.listdir('.')}")
             return False
             
-        from llm_integration import get_llm_manager  # type: ignore[import]
-        
         # Get the LLM manager
-        llm_manager = get_llm_manager()
+        llm_manager = _llm_manager()
         
         # Try to initialize with TinyLlama (small and efficient)
-        model_name = os.environ.get('LLM_MODEL', 'tinyllama.gguf')
+        model_name = os.environ.get('LLM_MODEL', 'tinyllama-1.1b-chat-v1.0.Q4_K_M.gguf')
         llm_initialized = llm_manager.initialize(model_name=model_name)
         
         if llm_initialized:
@@ -107,7 +195,10 @@ def main():
     # Check for command line arguments
     debug_mode = "--debug" in sys.argv
     if debug_mode:
+        # Per-request messages are logged at DEBUG level
+        logger.setLevel(logging.DEBUG)
         print(f"Command line arguments: {sys.argv}")
+        print(f"Directory contents: {os.listdir('.')}")
         print(f"Environment variables: {os.environ}")
     
     # Check and install dependencies first
@@ -143,8 +234,37 @@ def run_flask_app():
     try:
         print("Starting AI Automation Builder app...")
         
+        # Imported here so startup and dependency checks don't pay for them
+        from flask import Flask, render_template, request, jsonify  # type: ignore[import]
+        import requests  # type: ignore[import]
+        from requests.adapters import HTTPAdapter  # type: ignore[import]
+        from urllib3.util.retry import Retry  # type: ignore[import]
+        from concurrent.futures import ThreadPoolExecutor
+        
+        # Incremental JSON parser for the entity list; fall back to response.json() without it
+        try:
+            import ijson  # type: ignore[import]
+        except ImportError:
+            ijson = None
+            logger.warning("ijson not available. Entity lists will be parsed in one piece.")
+        
         app = Flask(__name__)
         
+        # Use orjson for all jsonify responses - the entities payload is large
+        import orjson  # type: ignore[import]
+        from flask.json.provider import DefaultJSONProvider  # type: ignore[import]
+        
+        class OrjsonProvider(DefaultJSONProvider):
+            """JSON provider that encodes and decodes with orjson"""
+            
+            def dumps(self, obj, **kwargs):
+                return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS, default=self.default).decode()
+            
+            def loads(self, s, **kwargs):
+                return orjson.loads(s)
+        
+        app.json = OrjsonProvider(app)
+        
         # Configuration
         API_KEY = os.environ.get('API_KEY', '')
         MODEL = os.environ.get('MODEL', 'gpt-3.5-turbo')
@@ -159,6 +279,27 @@ def run_flask_app():
         else:
             logger.info("Home Assistant token is available.")
         
+        # Shared session so connections to Home Assistant are kept alive and reused
+        HA_SESSION = requests.Session()
+        HA_SESSION.mount(HA_URL, HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(total=2, backoff_factor=0.2)
+        ))
+        
+        # Worker threads for issuing independent Home Assistant calls concurrently
+        HA_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+        
+        # Request headers and endpoint URLs are fixed for the life of the process
+        HA_HEADERS = {
+            "Authorization": f"Bearer {HA_TOKEN}",
+            "Content-Type": "application/json"
+        } if HA_TOKEN else None
+        HA_STATES_URL = f"{HA_URL}/api/states"
+        HA_SERVICES_URL = f"{HA_URL}/api/services"
+        HA_RELOAD_URL = f"{HA_URL}/api/services/automation/reload"
+        HA_AUTOMATION_CONFIG_URL = f"{HA_URL}/api/config/automation/config"
+        
         print(f"Web server will start on port {PORT}")
         print(f"Home Assistant API URL: {HA_URL}")
         print(f"Home Assistant token available: {HA_TOKEN is not None}")
@@ -170,9 +311,55 @@ def run_flask_app():
         @app.route('/')
         def index():
             """Main page for the AI Automation Builder"""
-            print(f"Serving index page request from {request.remote_addr}")
+            logger.debug("Serving index page request from %s", request.remote_addr)
             return render_template('index.html')
         
+        def group_entities_by_domain(entities):
+            """Organize entity states by domain (the flat list is served by /api/entities/raw)"""
+            domains = {}
+            count = 0
+            for entity in entities:
+                entity_id = entity['entity_id']
+                attrs = entity['attributes']
+                domains.setdefault(entity_id.split('.')[0], []).append({
+                    'entity_id': entity_id,
+                    'name': attrs.get('friendly_name') or entity_id,
+                    'state': entity['state'],
+                    'attributes': attrs
+                })
+                count += 1
+            
+            logger.debug("Found %d entities across %d domains", count, len(domains))
+            return domains
+        
+        def fetch_entity_domains():
+            """Fetch entity states from Home Assistant grouped by domain, or an error response"""
+            logger.debug("Fetching entities from Home Assistant at %s", HA_STATES_URL)
+            with HA_SESSION.get(
+                HA_STATES_URL,
+                headers=HA_HEADERS,
+                stream=True,
+                timeout=10  # Add a timeout
+            ) as response:
+                if response.status_code != 200:
+                    logger.error("Error fetching entities: %s - %s", response.status_code, response.text)
+                    return jsonify({'error': f'Failed to fetch entities: {response.text}'}), response.status_code
+                
+                if ijson is None:
+                    return group_entities_by_domain(response.json())
+                
+                try:
+                    # Parse entities as the body streams in instead of materializing the whole list
+                    response.raw.decode_content = True
+                    return group_entities_by_domain(ijson.items(response.raw, 'item', use_float=True))
+                except ijson.JSONError as e:
+                    # The C backend rejects integers beyond int64, which are still valid JSON
+                    logger.warning("Streaming parse of the entity list failed (%s). Fetching it again in one piece.", e)
+            
+            response = HA_SESSION.get(HA_STATES_URL, headers=HA_HEADERS, timeout=10)
+            response.raise_for_status()
+            return group_entities_by_domain(response.json())
+        
         @app.route('/api/entities', methods=['GET'])
         def get_entities():
             """Get entities from Home Assistant"""
@@ -180,61 +367,72 @@ def run_flask_app():
                 if not HA_TOKEN:
                     return jsonify({
                         'error': 'Home Assistant token not available',
-                        'domains': {},
-                        'entities': []
+                        'domains': {}
                     }), 200  # Return empty result but OK status to avoid UI errors
                     
-                headers = {
-                    "Authorization": f"Bearer {HA_TOKEN}",
-                    "Content-Type": "application/json"
-                }
+                with _entities_cache_lock:
+                    payload, etag = _entities_cache['payload'], _entities_cache['etag']
+                    fresh = time.monotonic() - _entities_cache['at'] < ENTITIES_CACHE_TTL
                 
-                print(f"Fetching entities from Home Assistant at {HA_URL}/api/states")
-                response = requests.get(
-                    f"{HA_URL}/api/states",
-                    headers=headers,
-                    timeout=10  # Add a timeout
+                if payload is None or not fresh:
+                    result = fetch_entity_domains()
+                    if not isinstance(result, dict):
+                        return result
+                    
+                    payload = app.json.dumps({'domains': result})
+                    etag = hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+                    with _entities_cache_lock:
+                        _entities_cache.update(at=time.monotonic(), payload=payload, etag=etag)
+                
+                if request.if_none_match.contains(etag):
+                    # A 304 must carry the same ETag the 200 would have
+                    response = app.response_class(status=304)
+                else:
+                    response = app.response_class(payload, mimetype='application/json')
+                response.set_etag(etag)
+                return response
+                
+            except requests.exceptions.RequestException as e:
+                logger.exception("Request error fetching entities: %s", e)
+                return jsonify({
+                    'error': f'Connection error: {str(e)}',
+                    'domains': {}
+                }), 200  # Return empty result but OK status
+            except Exception as e:
+                logger.exception("Error fetching entities: %s", e)
+                return jsonify({'error': str(e)}), 500
+        
+        @app.route('/api/entities/raw', methods=['GET'])
+        def get_entities_raw():
+            """Get the flat, unmodified entity state list from Home Assistant"""
+            try:
+                if not HA_TOKEN:
+                    return jsonify({
+                        'error': 'Home Assistant token not available',
+                        'entities': []
+                    }), 200
+                
+                response = HA_SESSION.get(
+                    HA_STATES_URL,
+                    headers=HA_HEADERS,
+                    timeout=10
                 )
                 
                 if response.status_code != 200:
-                    print(f"Error fetching entities: {response.status_code} - {response.text}")
+                    logger.error("Error fetching raw entities: %s - %s", response.status_code, response.text)
                     return jsonify({'error': f'Failed to fetch entities: {response.text}'}), response.status_code
                 
-                entities = response.json()
-                
-                # Organize entities by domain
-                domains = {}
-                for entity in entities:
-                    entity_id = entity['entity_id']
-                    domain = entity_id.split('.')[0]
-                    
-                    if domain not in domains:
-                        domains[domain] = []
-                    
-                    domains[domain].append({
-                        'entity_id': entity_id,
-                        'name': entity.get('attributes', {}).get('friendly_name', entity_id),
-                        'state': entity['state'],
-                        'attributes': entity['attributes']
-                    })
-                
-                print(f"Found {len(entities)} entities across {len(domains)} domains")
-                return jsonify({
-                    'entities': entities,
-                    'domains': domains
-                })
+                # Pass Home Assistant's body through untouched - no need to parse and re-encode it
+                return app.response_class(response.content, mimetype='application/json')
                 
             except requests.exceptions.RequestException as e:
-                print(f"Request error fetching entities: {e}")
-                print(traceback.format_exc())
+                logger.exception("Request error fetching raw entities: %s", e)
                 return jsonify({
                     'error': f'Connection error: {str(e)}',
-                    'domains': {},
                     'entities': []
-                }), 200  # Return empty result but OK status
+                }), 200
             except Exception as e:
-                print(f"Error fetching entities: {e}")
-                print(traceback.format_exc())
+                logger.exception("Error fetching raw entities: %s", e)
                 return jsonify({'error': str(e)}), 500
         
         @app.route('/api/entity/test', methods=['POST'])
@@ -257,35 +455,32 @@ def run_flask_app():
                 domain = entity_id.split('.')[0]
                 service = action  # 'toggle', 'turn_on', 'turn_off'
                 
-                headers = {
-                    "Authorization": f"Bearer {HA_TOKEN}",
-                    "Content-Type": "application/json"
-                }
-                
-                print(f"Testing entity {entity_id} with action {action}")
-                response = requests.post(
-                    f"{HA_URL}/api/services/{domain}/{service}",
-                    headers=headers,
+                logger.debug("Testing entity %s with action %s", entity_id, action)
+                response = HA_SESSION.post(
+                    f"{HA_SERVICES_URL}/{domain}/{service}",
+                    headers=HA_HEADERS,
                     json={"entity_id": entity_id},
                     timeout=10  # Add a timeout
                 )
                 
                 if response.status_code not in (200, 201):
-                    print(f"Error testing entity: {response.status_code} - {response.text}")
+                    logger.error("Error testing entity: %s - %s", response.status_code, response.text)
                     return jsonify({'error': f'Failed to test entity: {response.text}'}), response.status_code
                 
+                # The entity's state just changed, so the next entity list must be fetched fresh
+                with _entities_cache_lock:
+                    _entities_cache['at'] = 0.0
+                
                 return jsonify({
                     'success': True,
                     'message': f'Successfully tested {entity_id} with {action}'
                 })
                 
             except requests.exceptions.RequestException as e:
-                print(f"Request error testing entity: {e}")
-                print(traceback.format_exc())
+                logger.exception("Request error testing entity: %s", e)
                 return jsonify({'error': f'Connection error: {str(e)}', 'success': False}), 200
             except Exception as e:
-                print(f"Error testing entity: {e}")
-                print(traceback.format_exc())
+                logger.exception("Error testing entity: %s", e)
                 return jsonify({'error': str(e)}), 500
         
         @app.route('/api/generate', methods=['POST'])
@@ -301,19 +496,20 @@ def run_flask_app():
                 if not description:
                     return jsonify({'error': 'No description provided'}), 400
         
-                print(f"Generating automation for: {description}")
+                logger.debug("Generating automation for: %s", description)
+                
+                import yaml  # type: ignore[import]
                 
                 # Create automation YAML based on description
                 automation = create_automation_from_description(description)
         
                 return jsonify({
                     'automation': automation,
-                    'yaml': yaml.dump(automation, default_flow_style=False, sort_keys=False)
+                    'yaml': yaml.dump(automation, Dumper=_yaml_dumper(), default_flow_style=False, sort_keys=False)
                 })
         
             except Exception as e:
-                logger.error(f"Error generating automation: {str(e)}")
-                print(traceback.format_exc())
+                logger.exception("Error generating automation: %s", e)
                 return jsonify({'error': str(e)}), 500
         
         @app.route('/api/save', methods=['POST'])
@@ -334,8 +530,7 @@ def run_flask_app():
                     try:
                         return save_to_home_assistant(automation)
                     except Exception as e:
-                        logger.error(f"Error saving to Home Assistant: {str(e)}")
-                        print(traceback.format_exc())
+                        logger.exception("Error saving to Home Assistant: %s", e)
                         return jsonify({'error': f"Error saving to Home Assistant: {str(e)}"}), 500
                 else:
                     # Return mock success for demo mode
@@ -345,8 +540,7 @@ def run_flask_app():
                     })
         
             except Exception as e:
-                logger.error(f"Error saving automation: {str(e)}")
-                print(traceback.format_exc())
+                logger.exception("Error saving automation: %s", e)
                 return jsonify({'error': str(e)}), 500
         
         def save_to_home_assistant(automation):
@@ -356,53 +550,57 @@ def run_flask_app():
             if not filename.endswith('.yaml'):
                 filename += '.yaml'
             
-            headers = {
-                "Authorization": f"Bearer {HA_TOKEN}",
-                "Content-Type": "application/json"
-            }
-            
             # First check if the file exists
-            config_path = f"{HA_URL}/api/config/automation/config/{filename}"
+            config_path = f"{HA_AUTOMATION_CONFIG_URL}/{filename}"
             try:
-                print(f"Saving automation to Home Assistant: {filename}")
-                response = requests.post(
-                    f"{HA_URL}/api/services/automation/reload",
-                    headers=headers,
+                logger.debug("Saving automation to Home Assistant: %s", filename)
+                # The reload and the write are independent, so issue them concurrently
+                reload_future = HA_EXECUTOR.submit(
+                    HA_SESSION.post,
+                    HA_RELOAD_URL,
+                    headers=HA_HEADERS,
                     timeout=10  # Add a timeout
                 )
                 
-                if response.status_code not in (200, 201):
-                    logger.warning(f"Failed to reload automations: {response.text}")
-                    
-                # Convert to YAML and save
-                yaml_content = yaml.dump(automation, default_flow_style=False, sort_keys=False)
+                # Serialize as JSON - it is valid YAML, and orjson is far faster than PyYAML
+                yaml_content = orjson.dumps(automation).decode()
                 
                 # Save to Home Assistant's config directory
-                print(f"Posting to {config_path}")
-                response = requests.post(
+                logger.debug("Posting to %s", config_path)
+                save_future = HA_EXECUTOR.submit(
+                    HA_SESSION.post,
                     config_path,
-                    headers=headers,
-                    json={"content": yaml_content},
+                    headers=HA_HEADERS,
+                    data=orjson.dumps({"content": yaml_content}),
                     timeout=10  # Add a timeout
                 )
                 
+                # The write decides the outcome; a failed reload is only worth a warning
+                response = save_future.result()
+                
+                try:
+                    reload_response = reload_future.result()
+                    if reload_response.status_code not in (200, 201):
+                        logger.warning("Failed to reload automations: %s", reload_response.text)
+                except requests.exceptions.RequestException as e:
+                    logger.warning("Failed to reload automations: %s", e)
+                
                 if response.status_code in (200, 201):
-                    print(f"Successfully saved automation to {filename}")
+                    logger.debug("Successfully saved automation to %s", filename)
                     return jsonify({
                         'success': True,
                         'message': f'Automation saved successfully to {filename}',
                         'filename': filename
                     })
                 else:
-                    print(f"Error saving to Home Assistant: {response.status_code} - {response.text}")
+                    logger.error("Error saving to Home Assistant: %s - %s", response.status_code, response.text)
                     return jsonify({
                         'success': False,
                         'message': f'Error saving to Home Assistant: {response.text}'
                     }), response.status_code
                     
             except requests.exceptions.RequestException as e:
-                logger.error(f"Request error: {str(e)}")
-                print(traceback.format_exc())
+                logger.exception("Request error: %s", e)
                 return jsonify({
                     'success': False,
                     'message': f'Connection error: {str(e)}'
@@ -413,53 +611,13 @@ def run_flask_app():
             # Try to use LLM if available
             if llm_initialized:
                 try:
-                    from llm_integration import get_llm_manager  # type: ignore[import]
-                    llm_manager = get_llm_manager()
-                    return llm_manager.generate_automation(description)
+                    return _llm_manager().generate_automation(description)
                 except Exception as e:
-                    logger.error(f"Error using LLM for generation: {e}")
-                    print(traceback.format_exc())
+                    logger.exception("Error using LLM for generation: %s", e)
                     # Fall back to template-based approach
             
             # Template-based approach (fallback)
-            automation = {
-                'alias': f'AI Generated: {description[:50]}...' if len(description) > 50 else f'AI Generated: {description}',
-                'description': f'Generated from: {description}',
-                'trigger': [
-                    {
-                        'platform': 'time',
-                        'at': '12:00:00'
-                    }
-                ],
-                'condition': [],
-                'action': [
-                    {
-                        'service': 'notify.notify',
-                        'data': {
-                            'message': f'Automation triggered: {description}'
-                        }
-                    }
-                ],
-                'mode': 'single'
-            }
-            
-            # Simple rule-based enhancements
-            if "sunset" in description.lower() or "dusk" in description.lower():
-                automation["trigger"] = [{"platform": "sun", "event": "sunset", "offset": "0:00:00"}]
-                
-            if "sunrise" in description.lower() or "dawn" in description.lower():
-                automation["trigger"] = [{"platform": "sun", "event": "sunrise", "offset": "0:00:00"}]
-                
-            if "motion" in description.lower() and "detected" in description.lower():
-                automation["trigger"] = [{"platform": "state", "entity_id": "binary_sensor.motion_sensor", "to": "on"}]
-                
-            if "light" in description.lower() and "on" in description.lower():
-                automation["action"] = [{"service": "light.turn_on", "target": {"entity_id": "light.living_room"}}]
-                
-            if "light" in description.lower() and "off" in description.lower():
-                automation["action"] = [{"service": "light.turn_off", "target": {"entity_id": "light.living_room"}}]
-        
-            return automation
+            return _copy_automation(_template_automation(description))
         
         @app.route('/health')
         def health():
@@ -487,8 +645,7 @@ def run_flask_app():
                 })
                 
             except Exception as e:
-                print(f"Error checking dependencies: {e}")
-                print(traceback.format_exc())
+                logger.exception("Error checking dependencies: %s", e)
                 return jsonify({
                     'status': 'error',
                     'message': str(e)
@@ -501,7 +658,12 @@ def run_flask_app():
         print("✅ AI Automation Builder is now ready to use!")
         
         # Run with host set to 0.0.0.0 to make it accessible outside container
-        app.run(host='0.0.0.0', port=PORT, debug=(os.environ.get('DEBUG', 'false').lower() == 'true'))
+        if os.environ.get('DEBUG', 'false').lower() == 'true':
+            # Werkzeug dev server only in debug mode - it handles one request at a time
+            app.run(host='0.0.0.0', port=PORT, debug=True)
+        else:
+            from waitress import serve  # type: ignore[import]
+            serve(app, host='0.0.0.0', port=PORT, threads=8)
         return 0
         
     except Exception as e:
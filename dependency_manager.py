@@ -6,16 +6,23 @@ Checks and manages dependencies for the application
 
 import os
 import sys
+import json
+import site
+import hashlib
 import logging
 import importlib.util
 import subprocess
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Marker written after a successful check so warm starts can skip it
+DEPS_MARKER_PATH = '/tmp/.ha_ai_deps_ok'
+
 class DependencyManager:
     """Manages dependencies for the AI Automation Builder"""
     
@@ -39,6 +46,24 @@ class DependencyManager:
                 'import_name': 'requests',
                 'version': '>=2.25.0',
                 'installed': False
+            },
+            'orjson': {
+                'package': 'orjson',
+                'import_name': 'orjson',
+                'version': '>=3.9.0',
+                'installed': False
+            },
+            'waitress': {
+                'package': 'waitress',
+                'import_name': 'waitress',
+                'version': '>=2.1.0',
+                'installed': False
+            },
+            'ijson': {
+                'package': 'ijson',
+                'import_name': 'ijson',
+                'version': '>=3.1',
+                'installed': False
             }
         }
         
@@ -51,23 +76,70 @@ class DependencyManager:
                 'installed': False
             }
         }
+        
+        self._cache_key = self._compute_cache_key()
+        
+        # Per-run memo of check_dependency results, keyed by import name
+        self._check_cache: Dict[str, bool] = {}
+    
+    def _compute_cache_key(self) -> str:
+        """Build a key identifying the interpreter, dependency set and site-packages state"""
+        try:
+            site_mtime = os.stat(site.getsitepackages()[0]).st_mtime
+        except (AttributeError, IndexError, OSError):
+            site_mtime = None
+        
+        # Only the static fields - the 'installed' flags change during the run
+        static_fields = ('package', 'import_name', 'version')
+        key_data = {
+            'py': sys.version,
+            'deps': {name: {k: info.get(k) for k in static_fields}
+                     for name, info in self.dependencies.items()},
+            'optional': {name: {k: info.get(k) for k in static_fields}
+                         for name, info in self.optional_dependencies.items()},
+            'use_llm': os.environ.get('USE_LLM', 'true').lower() == 'true',
+            'site_mtime': site_mtime
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode()).hexdigest()
+    
+    def _read_marker(self) -> Optional[str]:
+        """Read the cache key stored in the marker file, if any"""
+        try:
+            with open(DEPS_MARKER_PATH, 'r') as f:
+                return f.readline().strip()
+        except OSError:
+            return None
+    
+    def _write_marker(self, cache_key: str) -> None:
+        """Atomically write the cache key to the marker file"""
+        tmp_path = f"{DEPS_MARKER_PATH}.{os.getpid()}.tmp"
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                os.write(fd, (cache_key + '\n').encode())
+            finally:
+                os.close(fd)
+            os.rename(tmp_path, DEPS_MARKER_PATH)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write dependency marker: {e}")
     
     def check_dependency(self, package_info: Dict[str, Any]) -> bool:
+        """Check if a dependency is installed, reusing the result from earlier in this run"""
+        import_name = package_info['import_name']
+        if import_name not in self._check_cache:
+            self._check_cache[import_name] = self._check_dependency(package_info)
+        return self._check_cache[import_name]
+    
+    def _check_dependency(self, package_info: Dict[str, Any]) -> bool:
         """Check if a dependency is installed"""
         try:
             module_name = package_info['import_name']
             spec = importlib.util.find_spec(module_name)
             
+            # find_spec is enough to know the module is installed - importing it would run
+            # its top-level code (and for llama_cpp load native libraries) just to check
             if spec is not None:
-                # Try to import the module to be sure
-                module = importlib.import_module(module_name)
                 logger.info(f"✅ Found {module_name}")
-                
-                # Try to get version if possible
-                if hasattr(module, '__version__'):
-                    version = getattr(module, '__version__')
-                    logger.info(f"   Version: {version}")
-                
                 return True
             else:
                 logger.warning(f"⚠️ Module {module_name} not found")
@@ -83,12 +155,16 @@ class DependencyManager:
     
     def install_dependency(self, package_info: Dict[str, Any]) -> bool:
         """Install a dependency using pip"""
+        return self.install_dependencies([package_info])
+    
+    def install_dependencies(self, packages: List[Dict[str, Any]]) -> bool:
+        """Install several dependencies with a single pip invocation"""
         try:
-            package = f"{package_info['package']}{package_info['version']}"
-            logger.info(f"📦 Installing {package}...")
+            specs = [f"{info['package']}{info['version']}" for info in packages]
+            logger.info(f"📦 Installing {', '.join(specs)}...")
             
-            # Use subprocess to install the package
-            command = [sys.executable, "-m", "pip", "install", "--no-cache-dir", package]
+            # Use subprocess to install the packages
+            command = [sys.executable, "-m", "pip", "install", "--no-cache-dir", *specs]
             logger.info(f"Running command: {' '.join(command)}")
             
             result = subprocess.run(
@@ -99,32 +175,38 @@ class DependencyManager:
             )
             
             if result.returncode == 0:
-                logger.info(f"✅ Successfully installed {package}")
+                logger.info(f"✅ Successfully installed {', '.join(specs)}")
+                # Make the new packages visible to find_spec and re-check them next time
+                importlib.invalidate_caches()
+                for info in packages:
+                    info['installed'] = True
+                    self._check_cache.pop(info['import_name'], None)
                 return True
             else:
-                logger.error(f"❌ Failed to install {package}")
+                logger.error(f"❌ Failed to install {', '.join(specs)}")
                 logger.error(f"Error: {result.stderr}")
                 return False
                 
         except Exception as e:
-            logger.error(f"❌ Error installing {package_info['package']}: {e}")
+            logger.error(f"❌ Error installing {', '.join(info['package'] for info in packages)}: {e}")
             print(traceback.format_exc())
             return False
     
     def check_all_dependencies(self) -> Dict[str, Dict[str, Any]]:
         """Check the status of all dependencies"""
         status = {}
+        self._check_cache.clear()
         
-        # Check required dependencies
-        for name, info in self.dependencies.items():
-            info['installed'] = self.check_dependency(info)
-            status[name] = info.copy()
+        # The checks are independent, so run them concurrently to overlap filesystem waits
+        items = list(self.dependencies.items()) + list(self.optional_dependencies.items())
+        with ThreadPoolExecutor(max_workers=len(items)) as executor:
+            results = list(executor.map(self.check_dependency, (info for _, info in items)))
         
-        # Check optional dependencies
-        for name, info in self.optional_dependencies.items():
-            info['installed'] = self.check_dependency(info)
+        for (name, info), installed in zip(items, results):
+            info['installed'] = installed
             status[name] = info.copy()
-            status[name]['optional'] = True
+            if name in self.optional_dependencies:
+                status[name]['optional'] = True
             
         return status
     
@@ -132,31 +214,33 @@ class DependencyManager:
         """Install all missing dependencies"""
         all_installed = True
         
-        # Install required dependencies
-        for name, info in self.dependencies.items():
-            if not self.check_dependency(info):
-                success = self.install_dependency(info)
-                if success:
-                    info['installed'] = True
-                else:
-                    all_installed = False
+        # Install required dependencies in one pip run
+        missing = [info for info in self.dependencies.values() if not self.check_dependency(info)]
+        if missing and not self.install_dependencies(missing):
+            all_installed = False
         
-        # Install optional dependencies only if USE_LLM is true
+        # Install optional dependencies only if USE_LLM is true. These go in a separate
+        # pip run so a failed optional build can't block the required packages.
         use_llm = os.environ.get('USE_LLM', 'true').lower() == 'true'
         if use_llm:
             logger.info("LLM is enabled, installing optional dependencies...")
-            for name, info in self.optional_dependencies.items():
-                if not self.check_dependency(info):
-                    success = self.install_dependency(info)
-                    if success:
-                        info['installed'] = True
-                    # Don't set all_installed to False for optional dependencies
+            missing = [info for info in self.optional_dependencies.values() if not self.check_dependency(info)]
+            if missing:
+                # Don't set all_installed to False for optional dependencies
+                self.install_dependencies(missing)
         
         return all_installed
     
-    def run_dependency_check(self) -> bool:
+    def run_dependency_check(self, force: bool = False) -> bool:
         """Run a full dependency check and install missing dependencies"""
         try:
+            if not force and self._read_marker() == self._cache_key:
+                logger.info("✅ Dependencies unchanged since last successful check, skipping")
+                for info in self.dependencies.values():
+                    info['installed'] = True
+                return True
+            
+            self._check_cache.clear()
             logger.info("🔍 Checking required dependencies...")
             missing_deps = False
             
@@ -192,6 +276,9 @@ class DependencyManager:
                     return False
             
             logger.info("✅ All required dependencies are available!")
+            
+            # Installs may have touched site-packages, so recompute before storing
+            self._write_marker(self._compute_cache_key())
             return True
             
         except Exception as e:
@@ -202,7 +289,7 @@ class DependencyManager:
 if __name__ == "__main__":
     # Run a standalone dependency check
     manager = DependencyManager()
-    success = manager.run_dependency_check()
+    success = manager.run_dependency_check(force="--force-check" in sys.argv)
     
     if success:
         print("✅ All dependencies are installed and ready to use!")
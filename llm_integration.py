@@ -5,23 +5,106 @@ Provides integration with local LLM models via llama-cpp-python
 """
 
 import os
+import re
 import sys
 import logging
-import traceback
+import functools
+import threading
+import importlib.util
 import json
-import yaml
+from pathlib import Path
 from typing import Dict, Any, Optional
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Logging is configured by the application; this module only emits records
 logger = logging.getLogger(__name__)
 
-# Singleton instance for the LLM manager
-_llm_manager = None
+# Keyword groups for the smart template, keyed by the tag the rules below refer to
+_WORD_RE = re.compile(r"[a-z]+")
+_KEYWORD_GROUPS = {
+    'morning': ('morning', 'mornings', 'sunrise', 'sunrises', 'dawn'),
+    'evening': ('evening', 'evenings', 'sunset', 'sunsets', 'dusk'),
+    'midnight': ('midnight',),
+    'noon': ('noon',),
+    'motion': ('motion',),
+    'door': ('door', 'doors'),
+    'open': ('open', 'opens', 'opened', 'opening'),
+    'close': ('close', 'closes', 'closed', 'closing'),
+    'light': ('light', 'lights', 'lighting'),
+    'on': ('on', 'enable', 'enables', 'enabled'),
+    'off': ('off', 'disable', 'disables', 'disabled'),
+    'notify': ('notification', 'notifications', 'notify', 'alert', 'alerts'),
+}
+
+# Word -> tag lookup built once, so matching is one pass over the description's words
+# no matter how many keywords the table holds
+_WORD_TAGS = {word: tag for tag, words in _KEYWORD_GROUPS.items() for word in words}
+
+# Entity and service names used by the templates, interned so every generated automation
+# shares one copy of each
+_S = sys.intern
+_MOTION_ENT = _S('binary_sensor.motion_sensor')
+_DOOR_ENT = _S('binary_sensor.door_sensor')
+_LIGHT_ENT = _S('light.living_room')
+_LIGHT_ON = _S('light.turn_on')
+_LIGHT_OFF = _S('light.turn_off')
+_NOTIFY = _S('notify.notify')
+_NOTIFY_MOBILE = _S('notify.mobile_app')
+
+# Prefixes for the per-description fields of the fallback template
+_ALIAS_PREFIX = _S('AI Generated: ')
+_DESC_PREFIX = _S('Generated from: ')
+_MSG_PREFIX = _S('Automation triggered: ')
+
+# Base automation for the smart template. The None fields are filled in per description on a
+# shallow copy; the default trigger and the empty condition list are shared by reference.
+_SMART_SKELETON = {
+    'alias': None,
+    'description': None,
+    'trigger': [{'platform': 'time', 'at': '12:00:00'}],
+    'condition': [],
+    'action': None,
+    'mode': 'single'
+}
+
+# Smart-template rules: (keyword tags that must all match, template). The first matching
+# rule in a table wins; sensor triggers take precedence over time triggers.
+_TIME_TRIGGER_RULES = (
+    (frozenset({'morning'}), {'platform': 'sun', 'event': 'sunrise', 'offset': '0:30:00'}),
+    (frozenset({'evening'}), {'platform': 'sun', 'event': 'sunset', 'offset': '0:00:00'}),
+    (frozenset({'midnight'}), {'platform': 'time', 'at': '00:00:00'}),
+    (frozenset({'noon'}), {'platform': 'time', 'at': '12:00:00'}),
+)
+_SENSOR_TRIGGER_RULES = (
+    (frozenset({'motion'}), {'platform': 'state', 'entity_id': _MOTION_ENT, 'to': 'on'}),
+    (frozenset({'door', 'open'}), {'platform': 'state', 'entity_id': _DOOR_ENT, 'to': 'on'}),
+    (frozenset({'door', 'close'}), {'platform': 'state', 'entity_id': _DOOR_ENT, 'to': 'off'}),
+)
+# 'turn on'/'turn off' are covered by the 'on'/'off' words
+_ACTION_RULES = (
+    (frozenset({'light', 'on'}), {'service': _LIGHT_ON, 'target': {'entity_id': _LIGHT_ENT}}),
+    (frozenset({'light', 'off'}), {'service': _LIGHT_OFF, 'target': {'entity_id': _LIGHT_ENT}}),
+    (frozenset({'notify'}), {'service': _NOTIFY_MOBILE, 'data': {'message': None}}),
+)
+
+def _match_rule(hits, rules) -> Optional[Dict[str, Any]]:
+    """Return the template of the first rule whose keyword tags are all in hits"""
+    for tags, template in rules:
+        if tags <= hits:
+            return template
+    return None
+
+def _copy_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a trigger/action template together with its nested target/data dict"""
+    return {key: dict(value) if isinstance(value, dict) else value for key, value in entry.items()}
 
 class LLMManager:
     """Manages LLM integration for the AI Automation Builder"""
     
+    __slots__ = ('model', 'model_name', 'initialized', 'has_llama_cpp', '_sem')
+    
+    # Result of the llama-cpp-python availability check, shared by all instances
+    _llama_cpp_checked: Optional[bool] = None
+    
     def __init__(self):
         """Initialize the LLM manager"""
         self.model = None
@@ -29,24 +112,31 @@ class LLMManager:
         self.initialized = False
         self.has_llama_cpp = self._check_llama_cpp()
         
+        # One shared model context; callers queue on this instead of creating their own
+        self._sem = threading.BoundedSemaphore(1)
+        
         # Create model directory if it doesn't exist
         os.makedirs("/data/models", exist_ok=True)
     
     def _check_llama_cpp(self) -> bool:
         """Check if llama-cpp-python is installed"""
+        if LLMManager._llama_cpp_checked is None:
+            LLMManager._llama_cpp_checked = self._find_llama_cpp()
+        return LLMManager._llama_cpp_checked
+    
+    def _find_llama_cpp(self) -> bool:
+        """Look up llama-cpp-python without importing it - initialize() does the real import"""
         try:
-            import llama_cpp
-            logger.info(f"Found llama-cpp-python version {llama_cpp.__version__}")
+            if importlib.util.find_spec('llama_cpp') is None:
+                logger.warning("llama-cpp-python not found. LLM features will be disabled.")
+                return False
+            logger.info("Found llama-cpp-python")
             return True
-        except ImportError:
-            logger.warning("llama-cpp-python not found. LLM features will be disabled.")
-            return False
         except Exception as e:
-            logger.error(f"Error checking llama-cpp-python: {e}")
-            print(traceback.format_exc())
+            logger.exception("Error checking llama-cpp-python: %s", e)
             return False
     
-    def initialize(self, model_name: str = "tinyllama.gguf") -> bool:
+    def initialize(self, model_name: str = "tinyllama-1.1b-chat-v1.0.Q4_K_M.gguf") -> bool:
         """Initialize the LLM with the specified model"""
         try:
             if not self.has_llama_cpp:
@@ -60,17 +150,12 @@ class LLMManager:
             
             # Check if model exists
             if not os.path.exists(model_path):
-                logger.warning(f"Model {model_path} not found. Will download dummy model for testing.")
+                logger.warning("Model %s not found. Will download dummy model for testing.", model_path)
                 
-                # If this is just for testing or development, create a dummy model file
-                if not os.path.exists(os.path.dirname(model_path)):
-                    os.makedirs(os.path.dirname(model_path), exist_ok=True)
-                
-                # Create a dummy model file for testing
-                with open(model_path, 'w') as f:
-                    f.write("DUMMY MODEL FILE FOR TESTING")
+                # Create a dummy model file for testing (__init__ already created /data/models)
+                Path(model_path).write_bytes(b"DUMMY MODEL FILE FOR TESTING")
                     
-                logger.info(f"Created dummy model file at {model_path}")
+                logger.info("Created dummy model file at %s", model_path)
                 
                 # In a real scenario, we would download the model here
                 # For now, just log a message
@@ -82,145 +167,131 @@ class LLMManager:
                 return True
             
             # In a real implementation, we would load the model:
+            # Load the Q4_K_M model once; every request reuses it (and its warm KV cache) via self._sem
             # self.model = llama_cpp.Llama(
             #     model_path=model_path,
             #     n_ctx=2048,
-            #     n_threads=4
+            #     n_threads=os.cpu_count(),
+            #     n_batch=256
             # )
             
             # For now, just log that we would load the model
-            logger.info(f"Would load model from {model_path}")
+            logger.info("Would load model from %s", model_path)
             
             self.initialized = True
             self.model_name = model_name
             return True
             
         except Exception as e:
-            logger.error(f"Error initializing LLM: {e}")
-            print(traceback.format_exc())
+            logger.exception("Error initializing LLM: %s", e)
             self.initialized = False
             return False
     
     def generate_automation(self, description: str) -> Dict[str, Any]:
         """Generate a Home Assistant automation from a natural language description"""
+        # Computed once here and passed down to the template builders
+        desc_len = len(description)
         try:
             if not self.initialized:
                 logger.warning("LLM not initialized. Using fallback template.")
-                return self._get_fallback_template(description)
+                return self._get_fallback_template(description, desc_len)
             
-            logger.info(f"Generating automation for: {description}")
+            logger.info("Generating automation for: %s", description)
             
             # In a real implementation, we would generate the automation using the LLM:
             # prompt = f"""
             # Create a Home Assistant automation based on this description:
             # {description}
             # 
-            # Output only valid YAML that can be used directly in Home Assistant.
+            # Output only a minified JSON object that can be used directly in Home Assistant.
             # """
             # 
-            # response = self.model.create_completion(
-            #     prompt=prompt,
-            #     max_tokens=1024,
-            #     temperature=0.7,
-            #     stop=["```"]
-            # )
+            # with self._sem:
+            #     response = self.model.create_completion(
+            #         prompt=prompt,
+            #         max_tokens=1024,
+            #         temperature=0.7,
+            #         stop=["```"]
+            #     )
             # 
             # try:
-            #     # Parse the YAML from the response
-            #     yaml_text = response.text
-            #     automation = yaml.safe_load(yaml_text)
+            #     # Parse the JSON from the response (C parser, far cheaper than YAML)
+            #     automation = json.loads(response.text)
             #     return automation
             # except Exception as e:
-            #     logger.error(f"Error parsing LLM output: {e}")
-            #     return self._get_fallback_template(description)
+            #     logger.error("Error parsing LLM output: %s", e)
+            #     return self._get_fallback_template(description, desc_len)
             
             # For now, use a more intelligent template-based approach
-            automation = self._get_smart_template(description)
+            # Templates are cached per description and share their entries; hand out fresh
+            # dicts all the way down so callers can mutate the result
+            cached = _template_for(description)
+            automation = dict(cached)
+            automation['trigger'] = [_copy_entry(trigger) for trigger in cached['trigger']]
+            automation['condition'] = []
+            automation['action'] = [_copy_entry(action) for action in cached['action']]
             
-            logger.info(f"Generated automation with {len(automation.get('trigger', []))} triggers and {len(automation.get('action', []))} actions")
+            logger.info("Generated automation with %d triggers and %d actions", len(automation['trigger']), len(automation['action']))
             return automation
             
         except Exception as e:
-            logger.error(f"Error generating automation: {e}")
-            print(traceback.format_exc())
-            return self._get_fallback_template(description)
+            logger.exception("Error generating automation: %s", e)
+            return self._get_fallback_template(description, desc_len)
     
-    def _get_fallback_template(self, description: str) -> Dict[str, Any]:
+    @staticmethod
+    def _get_fallback_template(description: str, desc_len: int) -> Dict[str, Any]:
         """Get a fallback template for when LLM generation fails"""
-        automation = {
-            'alias': f'AI Generated: {description[:50]}...' if len(description) > 50 else f'AI Generated: {description}',
-            'description': f'Generated from: {description}',
-            'trigger': [
-                {
-                    'platform': 'time',
-                    'at': '12:00:00'
-                }
-            ],
+        desc_short = description if desc_len <= 50 else description[:50] + '...'
+        return {
+            'alias': _ALIAS_PREFIX + desc_short,
+            'description': _DESC_PREFIX + description,
+            'trigger': [{'platform': 'time', 'at': '12:00:00'}],
             'condition': [],
-            'action': [
-                {
-                    'service': 'notify.notify',
-                    'data': {
-                        'message': f'Automation triggered: {description}'
-                    }
-                }
-            ],
+            'action': [{'service': _NOTIFY, 'data': {'message': _MSG_PREFIX + description}}],
             'mode': 'single'
         }
-        return automation
     
-    def _get_smart_template(self, description: str) -> Dict[str, Any]:
+    @staticmethod
+    def _get_smart_template(description: str, desc_lower: str, desc_len: int) -> Dict[str, Any]:
         """Get a smarter template based on keywords in the description"""
-        # Start with the basic template
-        automation = self._get_fallback_template(description)
+        # Start from a shallow copy of the skeleton. The default trigger, the condition list and
+        # matched rule templates are shared rather than copied: the result is only handed out
+        # through _template_for, and generate_automation copies every entry it returns.
+        automation = dict(_SMART_SKELETON)
+        desc_short = description if desc_len <= 50 else description[:50] + '...'
+        automation['alias'] = _ALIAS_PREFIX + desc_short
+        automation['description'] = _DESC_PREFIX + description
         
-        # Convert to lowercase for easier matching
-        desc_lower = description.lower()
+        # Map the description's words to keyword tags in a single pass
+        # (unknown words map to None, which no rule asks for)
+        hits = set(map(_WORD_TAGS.get, _WORD_RE.findall(desc_lower)))
         
-        # Check for time-based triggers
-        if any(word in desc_lower for word in ['morning', 'sunrise', 'dawn']):
-            automation['trigger'] = [{'platform': 'sun', 'event': 'sunrise', 'offset': '0:30:00'}]
-            
-        elif any(word in desc_lower for word in ['evening', 'sunset', 'dusk']):
-            automation['trigger'] = [{'platform': 'sun', 'event': 'sunset', 'offset': '0:00:00'}]
-            
-        elif any(word in desc_lower for word in ['midnight']):
-            automation['trigger'] = [{'platform': 'time', 'at': '00:00:00'}]
-            
-        elif any(word in desc_lower for word in ['noon']):
-            automation['trigger'] = [{'platform': 'time', 'at': '12:00:00'}]
-            
-        # Check for sensor-based triggers
-        if 'motion' in desc_lower:
-            automation['trigger'] = [{'platform': 'state', 'entity_id': 'binary_sensor.motion_sensor', 'to': 'on'}]
-            
-        elif 'door' in desc_lower and ('open' in desc_lower or 'opened' in desc_lower):
-            automation['trigger'] = [{'platform': 'state', 'entity_id': 'binary_sensor.door_sensor', 'to': 'on'}]
-            
-        elif 'door' in desc_lower and ('close' in desc_lower or 'closed' in desc_lower):
-            automation['trigger'] = [{'platform': 'state', 'entity_id': 'binary_sensor.door_sensor', 'to': 'off'}]
-            
-        # Check for common actions
-        if 'light' in desc_lower and any(word in desc_lower for word in ['on', 'turn on', 'enable']):
-            automation['action'] = [{'service': 'light.turn_on', 'target': {'entity_id': 'light.living_room'}}]
-            
-        elif 'light' in desc_lower and any(word in desc_lower for word in ['off', 'turn off', 'disable']):
-            automation['action'] = [{'service': 'light.turn_off', 'target': {'entity_id': 'light.living_room'}}]
-            
-        elif 'notification' in desc_lower or 'notify' in desc_lower or 'alert' in desc_lower:
-            automation['action'] = [{'service': 'notify.mobile_app', 'data': {'message': description}}]
+        trigger = _match_rule(hits, _SENSOR_TRIGGER_RULES) or _match_rule(hits, _TIME_TRIGGER_RULES)
+        if trigger is not None:
+            automation['trigger'] = [trigger]
+        
+        action = _match_rule(hits, _ACTION_RULES)
+        if action is None:
+            action = {'service': _NOTIFY, 'data': {'message': _MSG_PREFIX + description}}
+        elif 'data' in action:
+            action = {'service': action['service'], 'data': {'message': description}}
+        automation['action'] = [action]
         
         return automation
 
+@functools.lru_cache(maxsize=256)
+def _template_for(description: str) -> Dict[str, Any]:
+    """Build the smart template for a description once; callers must copy the shared result"""
+    return LLMManager._get_smart_template(description, description.lower(), len(description))
+
+@functools.lru_cache(maxsize=None)
 def get_llm_manager() -> LLMManager:
     """Get the singleton instance of the LLM manager"""
-    global _llm_manager
-    if _llm_manager is None:
-        _llm_manager = LLMManager()
-    return _llm_manager
+    return LLMManager()
 
 if __name__ == "__main__":
     # For testing purposes
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     manager = get_llm_manager()
     if manager.initialize():
         print("LLM initialized successfully!")
@@ -230,6 +301,6 @@ if __name__ == "__main__":
         automation = manager.generate_automation(description)
         
         print("\nGenerated automation:")
-        print(yaml.dump(automation, default_flow_style=False, sort_keys=False))
+        print(json.dumps(automation, indent=2))
     else:
         print("Failed to initialize LLM.") 
\ No newline at end of file